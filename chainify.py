@@ -10,7 +10,13 @@ from datetime import datetime as dt
 import gzip
 import re
 import argparse
+import hashlib
+import json
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import modules.dependencies as dp
+from modules.stats import ChainStats
 
 
 
@@ -36,7 +42,6 @@ BED_TO_BIGBED = os.path.join(BINARIES,"bedToBigBed")
 HG_LOAD_CHAIN = os.path.join(BINARIES, "hgLoadChain")
 BIG_CHAIN = os.path.join(BINARIES,"bigChain.as")
 BIG_LINK = os.path.join(BINARIES,"bigLink.as")
-LINK_TAB = os.path.join(TEMP_DIR, "link.tab")
 
 LOAD_CHAIN_ARGS = "-noBin -test"
 LOAD_CHAIN_GENOME = "hg38"
@@ -57,6 +62,9 @@ FAILURE = "failure"
 GENE = "gene"
 GENOME = "genome"
 CHROMOSOME = "chromosome"
+HUB = "hub"
+STATS = "stats"
+SERVE = "serve"
 
 VBOX = "VBoxManage"
 VERSION = "--version"
@@ -69,6 +77,25 @@ TRACK_TYPE = "track type=bigChain"
 LOCALHOST = "http://127.0.0.1:1234/folders"
 SHARED_FOLDER = "Documents" #Assuming its Documents
 
+HUB_DIR = "chainify_hub"
+HUB_NAME = "chainify"
+HUB_TXT = "hub.txt"
+GENOMES_TXT = "genomes.txt"
+TRACK_DB_TXT = "trackDb.txt"
+HUB_URL = "hubUrl="
+SHARD_MD5 = "shard.md5"
+SHARD_GROUP = "group"
+QUERY_GENOME = "query"
+
+SWAP = "swap"
+QUERY_PREFIX = "query."
+
+SERVICE_DIR = "chainify_service"
+SERVICE_CHAIN = "service.chain"
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_CACHE = 32
+
 
 
 class Chain:
@@ -124,6 +151,9 @@ class Chain:
         if not os.path.isfile(args.sizes):
             self.die(f"Chain file {args.sizes} does not exist.")
 
+        if args.swap and not os.path.isfile(args.query_sizes):
+            self.die(f"Query chromosome sizes file {args.query_sizes} does not exist.")
+
         if args.shared_folder:
             if not os.path.isdir(args.shared_folder):
                 self.die(f"{args.shared_folder} does not exist.")
@@ -232,49 +262,123 @@ class Chain:
         if args.gene:
             if self.__check_args(args) != MULTIPLE:
                 f = open(os.path.join(TEMP_DIR, f"{args.gene}.temp.chain"), "w")
+                swap = self._open_swap(args, f.name)
                 chain_id = args.gene.split(".")[1]
-                k,v = self.get_chain_coordinates(args, chain_id)
+                k,v = self._get_gene_chain(args, chain_id)
                 f.write(k + "\n" + v)
+                if self.stats:
+                    self.stats.add(k, v.split("\n"))
+                if swap:
+                    self._write_swap(swap, k, v.split("\n"))
+                    swap.close()
+                f.close()
                 print("Gene chain file created successfully.")
 
             else:
                 m = open(os.path.join(TEMP_DIR, "genes.temp.chain"), "w")
+                swap = self._open_swap(args, m.name)
                 genes = args.gene.split(",")
                 for gn in genes:
                     chain_id = gn.split(".")[1]
-                    k,v = self.get_chain_coordinates(args, chain_id)
+                    k,v = self._get_gene_chain(args, chain_id)
                     m.write(k + "\n" + v.rstrip() + "\n")
+                    if self.stats:
+                        self.stats.add(k, v.split("\n"))
+                    if swap:
+                        self._write_swap(swap, k, v.split("\n"))
+                if swap:
+                    swap.close()
+                m.close()
                 print("Gene chain file created successfully.")
                     
             return SUCCESS
 
 
 
-    def hg_load_chain(self, args):
-        """Make bigChain file from chain file."""
-        print("making bigChain file from the main chain file...")
-        if args.mode == GENE:
-            if self.__check_args(args) != MULTIPLE:
-                file = os.path.join(TEMP_DIR, f"{args.gene}.temp.chain")
-            else:
-                file = os.path.join(TEMP_DIR, "genes.temp.chain")
+    def _get_gene_chain(self, args, chain_id):
+        """Look up a gene's chain and stop if the chain file does not have it."""
+        k,v = self.get_chain_coordinates(args, chain_id)
+        if not k:
+            self.die(f"Chain {chain_id} was not found in {args.chain}.")
+        return (k, v)
+
+
+
+    def _swap_path(self, file):
+        """Name of the query-side (swapped) companion of a chain file."""
+        return f"{file.rsplit('.chain', 1)[0]}.{SWAP}.chain"
+
+
+
+    def _open_swap(self, args, file):
+        """Open the swapped chain file next to file if --swap was requested."""
+        if args.swap:
+            return open(self._swap_path(file), "w")
+        return None
+
+
+
+    def _write_swap(self, swap, header, blocks):
+        """Swap a chain and append it to the open swapped chain file."""
+        k, v = self.swap_chain(header, blocks)
+        swap.write(k + "\n" + "\n".join(v) + "\n")
+
+
+
+    @staticmethod
+    def swap_chain(header, blocks):
+        r"""Swap target and query of a chain (as chainSwap does).
+
+        Minus-strand queries are flipped onto the plus strand of the new
+        target: block sizes and gaps are reversed as whole columns and the
+        header coordinates are mirrored against the old query/target sizes.
+
+        >>> Chain.swap_chain("chain 900 chrA 100 + 10 30 chrB 50 + 5 27 1", ["10\t0\t2", "10"])
+        ('chain 900 chrB 50 + 5 27 chrA 100 + 10 30 1', ['10\t2\t0', '10'])
+        >>> Chain.swap_chain("chain 1000 chrA 100 + 10 40 chrB 50 - 5 35 7", ["10\t5\t0", "5\t0\t5", "10"])
+        ('chain 1000 chrB 50 + 15 45 chrA 100 - 60 90 7', ['10\t5\t0', '5\t0\t5', '10'])
+        """
+        (_, score, t_name, t_size, t_strand, t_start, t_end,
+            q_name, q_size, q_strand, q_start, q_end, chain_id) = header.split()
+
+        rows = [b.split() for b in blocks if b.strip()]
+        sizes = [r[0] for r in rows]
+        t_gaps = [r[1] for r in rows[:-1]]
+        q_gaps = [r[2] for r in rows[:-1]]
+
+        if q_strand == "-":
+            t_size, q_size = int(t_size), int(q_size)
+            new_t = [q_name, q_size, "+", q_size - int(q_end), q_size - int(q_start)]
+            new_q = [t_name, t_size, "-", t_size - int(t_end), t_size - int(t_start)]
+            sizes, t_gaps, q_gaps = sizes[::-1], q_gaps[::-1], t_gaps[::-1]
         else:
-            if self.__check_chain_file(args) == COMPRESSED:
-                cmd = f"zcat {args.chain} > {os.path.join(TEMP_DIR, str(args.chain).split('.gz')[0])}"
-                self.run_cmd(cmd)
-                file = os.path.join(TEMP_DIR, str(args.chain).split('.gz')[0])
-            else:
-                file = args.chain
+            new_t = [q_name, q_size, t_strand, q_start, q_end]
+            new_q = [t_name, t_size, q_strand, t_start, t_end]
+            t_gaps, q_gaps = q_gaps, t_gaps
+
+        k = " ".join(map(str, ["chain", score, *new_t, *new_q, chain_id]))
+        v = ["\t".join(r) for r in zip(sizes, t_gaps, q_gaps)] + sizes[-1:]
+        return (k, v)
 
-        if args.mode != GENE:
-            query_chain = open(file, "r")
-            chr_file = self.make_chromosome_chain(args, query_chain)
-            cmd = f"{HG_LOAD_CHAIN} {LOAD_CHAIN_ARGS} {LOAD_CHAIN_GENOME} {LOAD_CHAIN_FORMAT} {chr_file}"
 
+
+    def _load_big_chain(self, file, prefix=""):
+        """Run hgLoadChain on a chain file and convert its chain.tab into bigChain format."""
+        cmd = f"{HG_LOAD_CHAIN} {LOAD_CHAIN_ARGS} {LOAD_CHAIN_GENOME} {LOAD_CHAIN_FORMAT} {file}"
         rs = self.run_cmd(cmd)
 
-        chain = open("chain.tab", "r")
-        big_chain = open("chain.bigChain", "w")
+        self._to_big_chain("chain.tab", "chain.bigChain")
+        shutil.move("chain.tab", os.path.join(TEMP_DIR, f"{prefix}chain.tab"))
+        shutil.move("link.tab", os.path.join(TEMP_DIR, f"{prefix}link.tab"))
+        shutil.move("chain.bigChain", os.path.join(TEMP_DIR, f"{prefix}chain.bigChain"))
+        return
+
+
+
+    def _to_big_chain(self, chain_tab, big_chain):
+        """Convert an hgLoadChain chain.tab into bigChain (bed6+6) rows."""
+        chain = open(chain_tab, "r")
+        big_chain = open(big_chain, "w")
         
         for line in chain:
             line = re.sub(r'\.000000', "", line).strip().split()
@@ -284,24 +388,16 @@ class Chain:
             ]
             big_chain.write("\t".join(new_line) + "\n")
 
-        shutil.move("chain.tab", TEMP_DIR)
-        shutil.move("link.tab", TEMP_DIR)
-        shutil.move("chain.bigChain", TEMP_DIR)
-
-        print("bigChain file created successfully.")
-        return SUCCESS
-
+        chain.close()
+        big_chain.close()
+        return
 
 
-    def bed_to_bigbed(self, args):
-        """Make bigBed and bigBedLink file from bigChain file."""
-        print("making the bigBed file from the bigChain file...")
-        cmd = f"{BED_TO_BIGBED} {BIG_BED_TYPE_SIX} -as={BIG_CHAIN} -tab {TEMP_DIR}/chain.bigChain {args.sizes} {TEMP_DIR}/{BIG_BED_OUTPUT}"
-        rs = subprocess.Popen(cmd, shell=True)
-        rs.wait()
 
-        f = open(LINK_TAB, "r")
-        o = open(BIG_LINK_OUTPUT, "w")
+    def _to_big_link(self, link_tab, big_link):
+        """Convert an hgLoadChain link.tab into sorted bigLink (bed4+1) rows."""
+        f = open(link_tab, "r")
+        o = open(big_link, "w")
 
         link_list = []
         for line in f:
@@ -310,11 +406,54 @@ class Chain:
         
         link_sorted = sorted(link_list, key=lambda x: (x.split('\t')[0], int(x.split('\t')[1])))
         o.write("\n".join(link_sorted))
-        shutil.move(BIG_LINK_OUTPUT, TEMP_DIR)
+        f.close()
+        o.close()
+        return
+
+
+
+    def hg_load_chain(self, args):
+        """Make bigChain file from chain file."""
+        print("making bigChain file from the main chain file...")
+        if args.mode == GENE:
+            if self.__check_args(args) != MULTIPLE:
+                chr_file = os.path.join(TEMP_DIR, f"{args.gene}.temp.chain")
+            else:
+                chr_file = os.path.join(TEMP_DIR, "genes.temp.chain")
+        else:
+            if self.__check_chain_file(args) == COMPRESSED:
+                query_chain = gzip.open(args.chain, "rt")
+            else:
+                query_chain = open(args.chain, "r")
+            with query_chain:
+                chr_file = self.make_chromosome_chain(args, query_chain)
+
+        self._load_big_chain(chr_file)
+        if args.swap:
+            print("making query-side bigChain file from the swapped chain file...")
+            self._load_big_chain(self._swap_path(chr_file), QUERY_PREFIX)
+
+        print("bigChain file created successfully.")
+        return SUCCESS
+
+
+
+    def bed_to_bigbed(self, args, sizes=None, prefix=""):
+        """Make bigBed and bigBedLink file from bigChain file."""
+        sizes = sizes if sizes else args.sizes
+        print("making the bigBed file from the bigChain file...")
+        cmd = f"{BED_TO_BIGBED} {BIG_BED_TYPE_SIX} -as={BIG_CHAIN} -tab {TEMP_DIR}/{prefix}chain.bigChain {sizes} {TEMP_DIR}/{prefix}{BIG_BED_OUTPUT}"
+        rs = subprocess.Popen(cmd, shell=True)
+        rs.wait()
+
+        self._to_big_link(
+            os.path.join(TEMP_DIR, f"{prefix}link.tab"),
+            os.path.join(TEMP_DIR, f"{prefix}{BIG_LINK_OUTPUT}")
+        )
         print("bigLink file created successfully.")
 
         print("making the bigBedLink file from the bigChain file...")
-        cmd = f"{BED_TO_BIGBED} {BIG_BED_TYPE_FOUR} -as={BIG_LINK} -tab {os.path.join(TEMP_DIR,BIG_LINK_OUTPUT)} {args.sizes} {os.path.join(TEMP_DIR,BIG_CHAIN_OUTPUT)}"
+        cmd = f"{BED_TO_BIGBED} {BIG_BED_TYPE_FOUR} -as={BIG_LINK} -tab {os.path.join(TEMP_DIR,prefix+BIG_LINK_OUTPUT)} {sizes} {os.path.join(TEMP_DIR,prefix+BIG_CHAIN_OUTPUT)}"
         rs = subprocess.Popen(cmd, shell=True)
         rs.wait()
         print("bigBedLink file created successfully.")
@@ -323,15 +462,222 @@ class Chain:
 
 
 
+    def read_chrom_sizes(self, path):
+        """Read a chromosome sizes file into an ordered {chromosome: size} dict."""
+        if any(x == "gz" for x in path.split(".")):
+            sizes = gzip.open(path, "rt")
+        else:
+            sizes = open(path, "r")
+
+        chrom_sizes = {}
+        with sizes:
+            for line in sizes:
+                fields = line.strip().split("\t")
+                if len(fields) == CHROM_SIZES_COLS:
+                    chrom_sizes[fields[0]] = int(fields[1])
+        return chrom_sizes
+
+
+
+    def _shared_dir(self, args):
+        """Local path of the folder shared with GBiB."""
+        if args.shared_folder:
+            return os.path.abspath(os.path.expanduser(args.shared_folder))
+        return os.path.join(os.path.expanduser('~'), SHARED_FOLDER)
+
+
+
+    def _shared_url(self, args):
+        """URL under which the shared folder is reachable from the browser."""
+        if args.hub_url:
+            return args.hub_url.rstrip("/")
+        sf = "_".join(["sf", os.path.basename(self._shared_dir(args))])
+        return "/".join([LOCALHOST, sf])
+
+
+
+    def _make_shards(self, args, chrom_sizes, chroms):
+        """Group chromosomes into named shards, keeping the chromosome sizes order.
+
+        Shard names are used as directory and hub track names, so anything
+        but letters, digits and underscores is replaced by an underscore.
+        """
+        ordered = [c for c in chrom_sizes if c in chroms]
+        ordered += sorted(c for c in chroms if c not in chrom_sizes)
+
+        size = max(args.chroms_per_shard, 1)
+        shards = {}
+        for i in range(0, len(ordered), size):
+            group = ordered[i:i + size]
+            name = re.sub(r"\W", "_", group[0]) if size == 1 else f"{SHARD_GROUP}{i // size + 1}"
+            if name in shards:
+                name = f"{name}_{i + 1}"
+            shards[name] = group
+        return shards
+
+
+
+    def _build_shard(self, sizes, shard_dir, prefix, chain_rows, link_rows, shard_sizes):
+        """Build the bigChain/bigLink bigBeds of a single shard, reusing them if unchanged.
+
+        The cache digest covers the rows, the shard chromosome sizes and the
+        bigChain/bigLink .as files, so any of them changing forces a rebuild.
+        """
+        chain_rows = sorted(chain_rows, key=lambda x: (x.split('\t')[0], int(x.split('\t')[1])))
+        link_rows = sorted(link_rows, key=lambda x: (x.split('\t')[0], int(x.split('\t')[1])))
+        chain_text = "\n".join(chain_rows) + "\n"
+        link_text = "\n".join(link_rows) + "\n"
+        md5_text = chain_text + link_text + shard_sizes
+        for autosql in [BIG_CHAIN, BIG_LINK]:
+            if os.path.isfile(autosql):
+                with open(autosql, "r") as f:
+                    md5_text += f.read()
+        digest = hashlib.md5(md5_text.encode()).hexdigest()
+
+        big_bed = os.path.join(shard_dir, BIG_BED_OUTPUT)
+        big_link = os.path.join(shard_dir, BIG_CHAIN_OUTPUT)
+        md5 = os.path.join(shard_dir, SHARD_MD5)
+        if os.path.isfile(big_bed) and os.path.isfile(big_link) and os.path.isfile(md5):
+            with open(md5, "r") as f:
+                if f.read().strip() == digest:
+                    return "cached"
+
+        os.makedirs(shard_dir, exist_ok=True)
+        name = os.path.basename(shard_dir)
+        chain_tab = os.path.join(TEMP_DIR, f"{prefix}{name}.bigChain")
+        link_tab = os.path.join(TEMP_DIR, f"{prefix}{name}.bigLink")
+        with open(chain_tab, "w") as f:
+            f.write(chain_text)
+        with open(link_tab, "w") as f:
+            f.write(link_text)
+
+        cmds = [
+            f"{BED_TO_BIGBED} {BIG_BED_TYPE_SIX} -as={BIG_CHAIN} -tab {chain_tab} {sizes} {big_bed}",
+            f"{BED_TO_BIGBED} {BIG_BED_TYPE_FOUR} -as={BIG_LINK} -tab {link_tab} {sizes} {big_link}"
+        ]
+        for cmd in cmds:
+            rs = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            if rs.returncode != 0:
+                return f"{FAILURE}: {rs.stderr.strip()}"
+
+        with open(md5, "w") as f:
+            f.write(digest + "\n")
+        return "built"
+
+
+
+    def make_hub(self, args, genome, sizes, prefix=""):
+        """Split bigChain/bigLink files into per-chromosome bigBed shards under the hub genome directory."""
+        print(f"making per-chromosome bigBed shards for {genome}...")
+        chain_rows, link_rows = {}, {}
+        with open(os.path.join(TEMP_DIR, f"{prefix}chain.bigChain"), "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    chain_rows.setdefault(line.split("\t")[0], []).append(line)
+
+        with open(os.path.join(TEMP_DIR, f"{prefix}link.tab"), "r") as f:
+            for line in f:
+                fields = line.strip().split()
+                if fields:
+                    link_rows.setdefault(fields[0], []).append(
+                        '\t'.join([fields[0], fields[1], fields[2], fields[4], fields[3]]))
+
+        chrom_sizes = self.read_chrom_sizes(sizes)
+        shards = self._make_shards(args, chrom_sizes, set(chain_rows))
+        if not shards:
+            self.die(f"No alignments left for {genome} after filtering, the hub would be empty.")
+        genome_dir = os.path.join(self._shared_dir(args), HUB_DIR, genome)
+
+        with ThreadPoolExecutor(max_workers=max(args.threads, 1)) as pool:
+            jobs = {
+                name: pool.submit(
+                    self._build_shard,
+                    sizes,
+                    os.path.join(genome_dir, name),
+                    prefix,
+                    [r for c in chroms for r in chain_rows.get(c, [])],
+                    [r for c in chroms for r in link_rows.get(c, [])],
+                    "".join(f"{c}\t{chrom_sizes.get(c)}\n" for c in chroms)
+                )
+                for name, chroms in shards.items()
+            }
+            for name, job in jobs.items():
+                status = job.result()
+                if status.startswith(FAILURE):
+                    self.die(f"Shard {name} could not be built. {status}")
+                print(f"Shard {name}: {status}")
+
+        return shards
+
+
+
+    def write_hub(self, args, genomes):
+        """Write hub.txt, genomes.txt and one trackDb.txt per genome referencing its shards.
+
+        genomes maps each hub genome to (other genome, shards).
+        """
+        hub_dir = os.path.join(self._shared_dir(args), HUB_DIR)
+        label = args.name if args.name else HUB_NAME
+        description = args.description if args.description else f"{label} alignment chains"
+        for genome in genomes:
+            os.makedirs(os.path.join(hub_dir, genome), exist_ok=True)
+
+        with open(os.path.join(hub_dir, HUB_TXT), "w") as f:
+            f.write(
+                f"hub {HUB_NAME}\n"
+                f"shortLabel {label}\n"
+                f"longLabel {description}\n"
+                f"genomesFile {GENOMES_TXT}\n"
+                f"email {args.email}\n"
+            )
+
+        with open(os.path.join(hub_dir, GENOMES_TXT), "w") as f:
+            f.write("\n".join(f"genome {g}\ntrackDb {g}/{TRACK_DB_TXT}\n" for g in genomes))
+
+        for genome, (other, shards) in genomes.items():
+            track_type = f"{LOAD_CHAIN_FORMAT} {other}"
+            with open(os.path.join(hub_dir, genome, TRACK_DB_TXT), "w") as f:
+                f.write(
+                    f"track {HUB_NAME}\n"
+                    f"compositeTrack on\n"
+                    f"shortLabel {label}\n"
+                    f"longLabel {description}\n"
+                    f"type {track_type}\n"
+                    f"visibility pack\n"
+                )
+                for name, chroms in shards.items():
+                    f.write(
+                        f"\n"
+                        f"    track {HUB_NAME}_{name}\n"
+                        f"    parent {HUB_NAME} on\n"
+                        f"    shortLabel {name}\n"
+                        f"    longLabel {label} {','.join(chroms)}\n"
+                        f"    type {track_type}\n"
+                        f"    bigDataUrl {name}/{BIG_BED_OUTPUT}\n"
+                        f"    linkDataUrl {name}/{BIG_CHAIN_OUTPUT}\n"
+                    )
+
+        print(f"Track hub created successfully at {hub_dir}.")
+        return SUCCESS
+
+
+
     def mode(self, args):
         """Check whether the mode is specified or is gene or genome."""
         if not args.mode:
             return GENE
         else:
-            if args.mode not in [GENE, GENOME, CHROMOSOME]:
-                self.die("Mode not recognized. Please use gene or genome.")
+            if args.mode not in [GENE, GENOME, CHROMOSOME, HUB, STATS, SERVE]:
+                self.die("Mode not recognized. Please use gene, chromosome, genome, hub, stats or serve.")
             elif args.mode == GENOME:
                 return GENOME
+            elif args.mode == SERVE:
+                return SERVE
+            elif args.mode == STATS:
+                return STATS
+            elif args.mode == HUB:
+                return HUB
             elif args.mode == CHROMOSOME:
                 return CHROMOSOME
             else:
@@ -347,35 +693,53 @@ class Chain:
         else:
             print(f"Filtering negative chain scores from {args.chain}...")
             name = f"{args.chain.split('.chain')[0]}_noneg"
-        chain_dict = {}
-        current_chain = None
         chr_chain = open(f"{TEMP_DIR}/{name}.chain", "w")
+        swap = self._open_swap(args, chr_chain.name)
 
-        for line in file:
-            if line.startswith("chain"):
-                current_chain = line.strip()
-                if int(current_chain.split(" ")[1]) > 0:
-                    chain_dict[current_chain] = []
-                else:
-                    current_chain = None
-            else:
-                if current_chain:
-                    chain_dict[current_chain].append(line.strip())
-
-    
-        for k,v in chain_dict.items():
-            if args.chromosome:
-                if k.split(" ")[2] == args.chromosome:
-                    chr_chain.write(k + "\n" + "\n".join(v) + "\n")
-            else:
-                chr_chain.write(k + "\n" + "\n".join(v) + "\n")
+        for header, blocks in self.read_chains(file):
+            if self.stats:
+                self.stats.add(header, blocks)
+            if int(header.split(" ")[1]) > 0:
+                self._write_chain(args, chr_chain, swap, header, blocks)
 
         chr_chain.close()
+        if swap:
+            swap.close()
         #name = os.path.join(TEMP_DIR, chr_chain.name)
         return chr_chain.name
 
 
 
+    def read_chains(self, file):
+        """Stream (header, block lines) tuples from an open chain file."""
+        header = None
+        blocks = []
+        for line in file:
+            if line.startswith("chain"):
+                if header:
+                    yield (header, blocks)
+                header = line.strip()
+                blocks = []
+            elif header and line.strip():
+                blocks.append(line.strip())
+
+        if header:
+            yield (header, blocks)
+
+
+
+    def _write_chain(self, args, chr_chain, swap, header, blocks):
+        """Write a chain (and its swapped copy) if it passes the chromosome filter."""
+        if args.chromosome and header.split(" ")[2] != args.chromosome:
+            return
+
+        chr_chain.write(header + "\n" + "\n".join(blocks) + "\n")
+        if swap:
+            self._write_swap(swap, header, blocks)
+        return
+
+
+
     def _check_gbib(self):
         """Check whether GBiB is installed."""
         try: 
@@ -414,6 +778,10 @@ class Chain:
                 os.makedirs(RESULTS, exist_ok=True)
 
             f = open(os.path.join(RESULTS, OUT), "w")
+            if self.mode(args) == HUB:
+                f.write(f"{HUB_URL}{'/'.join([self._shared_url(args), HUB_DIR, HUB_TXT])}")
+                return SUCCESS
+
             if not args.shared_folder:
                 sf = "_".join(["sf", SHARED_FOLDER])
                 path = "/".join([LOCALHOST, sf])
@@ -421,37 +789,114 @@ class Chain:
                 sf = "_".join(["sf", args.shared_folder])
                 path = "/".join([LOCALHOST, SHARED_FOLDER])
             
-            link = f"{TRACK_TYPE} {BIG_DATA_URL}{os.path.join(path, BIG_BED_OUTPUT)} {LINK_DATA_URL}{os.path.join(path, BIG_CHAIN_OUTPUT)}"   
-
-            if args.name:
-                name = f" name={args.name}"
-                link += name
+            link = self.track_line(path, args.name, args.description)
 
-            if args.description:
-                desc = f" description={args.description}"
-                link += desc
+            if args.swap:
+                name = f"{args.name}_{SWAP}" if args.name else args.query_genome
+                desc = f"{args.description} ({args.query_genome})" if args.description else None
+                link += "\n" + self.track_line(path, name, desc, QUERY_PREFIX)
 
             f.write(link)
             return SUCCESS
 
 
 
+    def track_line(self, path, name=None, description=None, prefix=""):
+        """Build a bigChain track line for the bigBed pair found under path."""
+        link = f"{TRACK_TYPE} {BIG_DATA_URL}{os.path.join(path, prefix + BIG_BED_OUTPUT)} {LINK_DATA_URL}{os.path.join(path, prefix + BIG_CHAIN_OUTPUT)}"
+
+        if name:
+            link += f" name={name}"
+
+        if description:
+            link += f" description={description}"
+
+        return link
+
+
+
+    def chain_stats(self, args):
+        """Compute chain statistics in a single read of the chain file, without building tracks."""
+        print(f"Computing chain statistics from {args.chain}...")
+        if self.__check_chain_file(args) == COMPRESSED:
+            chain = gzip.open(args.chain, "rt")
+        else:
+            chain = open(args.chain, "r")
+
+        with chain:
+            for header, blocks in self.read_chains(chain):
+                self.stats.add(header, blocks)
+        return SUCCESS
+
+
+
+    def write_stats(self, args):
+        """Write the chain statistics collected during the run to the results folder."""
+        tsv, js = self.stats.write(RESULTS, self.read_chrom_sizes(args.sizes))
+        print(f"Chain statistics are available at: {tsv} and {js}")
+        return SUCCESS
+
+
+
     def run(self, args):
+        self.stats = ChainStats() if args.stats or self.mode(args) == STATS else None
+        if self.mode(args) == STATS:
+            self.chain_stats(args)
+            self.write_stats(args)
+            self.clean_up(args)
+            print("### Chainify finished successfully. ###")
+            return
+
+        if self.mode(args) == SERVE:
+            try:
+                asyncio.run(ChainService(self, args).serve())
+            except KeyboardInterrupt:
+                print("Chainify service stopped.")
+            self.clean_up(args)
+            return
+
         f = open(os.path.join(TEMP_DIR, OUT), "w")
         if self.mode(args) == GENE:
             if self._make_chain_from_gene(args) == SUCCESS:
                 if self.hg_load_chain(args):
                     self.bed_to_bigbed(args)
+                    if args.swap:
+                        self.bed_to_bigbed(args, args.query_sizes, QUERY_PREFIX)
                     self._check_gbib()
+        elif self.mode(args) == HUB:
+            self.hg_load_chain(args)
+            genomes = {args.target_genome: (args.query_genome, self.make_hub(args, args.target_genome, args.sizes))}
+            if args.swap:
+                genomes[args.query_genome] = (
+                    args.target_genome,
+                    self.make_hub(args, args.query_genome, args.query_sizes, QUERY_PREFIX)
+                )
+            self.write_hub(args, genomes)
+            self._check_gbib()
+            self.make_link(args)
+            if self.stats:
+                self.write_stats(args)
+            self.clean_up(args)
+
+            print("### Chainify finished successfully. ###")
+            print(f"Results are available at: {os.path.join(RESULTS, OUT)}")
+            return
         else:
             self.hg_load_chain(args)
             self.bed_to_bigbed(args)
+            if args.swap:
+                self.bed_to_bigbed(args, args.query_sizes, QUERY_PREFIX)
             self._check_gbib()
 
 
         self.make_link(args)
         shutil.move(os.path.join(TEMP_DIR, BIG_BED_OUTPUT), os.path.join(os.path.expanduser('~'), SHARED_FOLDER))
         shutil.move(os.path.join(TEMP_DIR, BIG_CHAIN_OUTPUT), os.path.join(os.path.expanduser('~'), SHARED_FOLDER))
+        if args.swap:
+            shutil.move(os.path.join(TEMP_DIR, QUERY_PREFIX + BIG_BED_OUTPUT), os.path.join(os.path.expanduser('~'), SHARED_FOLDER))
+            shutil.move(os.path.join(TEMP_DIR, QUERY_PREFIX + BIG_CHAIN_OUTPUT), os.path.join(os.path.expanduser('~'), SHARED_FOLDER))
+        if self.stats:
+            self.write_stats(args)
         self.clean_up(args)
 
         print("### Chainify finished successfully. ###")
@@ -459,6 +904,302 @@ class Chain:
 
 
 
+class ChainService:
+    """Long-running gene/region lookup service keeping the chain index warm.
+
+    Requests are JSON lines ({"genes": "ENST00000373688.209092,..."} or
+    {"region": "chr1:100-2000"}, plus optional name/description) and each
+    one is answered with a JSON line holding the bigBed paths and track line.
+    """
+    def __init__(self, chain, args):
+        self.chain = chain
+        self.args = args
+        self.cache = OrderedDict()
+        self.waiters = {}
+        self.builds = 0
+        self.index = {}
+        self.regions = {}
+        self.source = None
+        self.semaphore = None
+        self.service_dir = os.path.join(chain._shared_dir(args), SERVICE_DIR)
+        self.service_url = "/".join([chain._shared_url(args), SERVICE_DIR])
+        self.input_id = self._input_id()
+        self.build_index()
+
+
+
+    def _input_id(self):
+        """Identity of the chain and sizes files, so cache keys never outlive them."""
+        parts = []
+        for path in [self.args.chain, self.args.sizes] + ([self.args.query_sizes] if self.args.swap else []):
+            st = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}")
+        return "|".join(parts)
+
+
+
+    def build_index(self):
+        """Record the byte offset of every chain (decompressing gz input once).
+
+        With --stats the same pass also feeds the chain statistics.
+        """
+        print(f"Indexing chains from {self.args.chain}...")
+        if any(x == "gz" for x in self.args.chain.split(".")):
+            src = gzip.open(self.args.chain, "rb")
+            self.source = os.path.join(TEMP_DIR, SERVICE_CHAIN)
+            copy = open(self.source, "wb")
+        else:
+            src = open(self.args.chain, "rb")
+            self.source = self.args.chain
+            copy = None
+
+        stats = self.chain.stats
+        offset = 0
+        current = None
+        header, blocks = None, []
+        with src:
+            for line in src:
+                if copy:
+                    copy.write(line)
+                if line.startswith(b"chain"):
+                    if current:
+                        self.index[current[0]] = (current[1], offset - current[1])
+                    if stats and header:
+                        stats.add(header, blocks)
+                    header, blocks = line.decode().strip(), []
+                    fields = header.split()
+                    current = (fields[-1], offset)
+                    if int(fields[1]) > 0:
+                        self.regions.setdefault(fields[2], []).append(
+                            (int(fields[5]), int(fields[6]), fields[-1]))
+                elif stats and header and line.strip():
+                    blocks.append(line.decode().strip())
+                offset += len(line)
+
+        if current:
+            self.index[current[0]] = (current[1], offset - current[1])
+        if stats and header:
+            stats.add(header, blocks)
+            self.chain.write_stats(self.args)
+        if copy:
+            copy.close()
+
+        self.fd = os.open(self.source, os.O_RDONLY)
+        print(f"{len(self.index)} chains indexed.")
+        return SUCCESS
+
+
+
+    def chain_ids(self, request):
+        """Resolve the chain ids a request refers to."""
+        if request.get("genes"):
+            return sorted({gn.split(".")[1] for gn in request["genes"].split(",")})
+
+        if request.get("region"):
+            chrom, span = request["region"].replace(",", "").split(":")
+            start, end = [int(x) for x in span.split("-")]
+            return sorted({
+                chain_id for t_start, t_end, chain_id in self.regions.get(chrom, [])
+                if t_start < end and t_end > start
+            })
+
+        raise ValueError("Request needs 'genes' or 'region'.")
+
+
+
+    async def _exec(self, cmd, cwd):
+        """Run a command asynchronously inside cwd and fail on non-zero exit."""
+        proc = await asyncio.create_subprocess_shell(
+            cmd, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        _, err = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f"{cmd.split()[0]} failed: {err.decode().strip()}")
+
+
+
+    async def build(self, key, ids):
+        """Extract the chains and build their bigBed pair in a fresh directory."""
+        self.builds += 1
+        workdir = os.path.join(self.service_dir, f"{key}.{self.builds}")
+        os.makedirs(workdir)
+        try:
+            await self._build(workdir, ids)
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        return workdir
+
+
+
+    async def _build(self, workdir, ids):
+        """Build the requested chains (and their swapped copies with --swap) inside workdir."""
+        chains = [os.pread(self.fd, *self.index[chain_id][::-1]) for chain_id in ids]
+        await self._build_pair(workdir, b"".join(chains), self.args.sizes)
+
+        if self.args.swap:
+            swapped = []
+            for raw in chains:
+                lines = raw.decode().strip().split("\n")
+                k, v = self.chain.swap_chain(lines[0], lines[1:])
+                swapped.append(k + "\n" + "\n".join(v) + "\n")
+            await self._build_pair(workdir, "".join(swapped).encode(), self.args.query_sizes, QUERY_PREFIX)
+        return
+
+
+
+    async def _build_pair(self, workdir, chains, sizes, prefix=""):
+        """Run hgLoadChain and bedToBigBed on raw chains, leaving {prefix}bigChain bigBeds in workdir."""
+        sizes = os.path.abspath(sizes)
+        scratch = os.path.join(workdir, f"{prefix}{TEMP}")
+        os.makedirs(scratch)
+        with open(os.path.join(scratch, SERVICE_CHAIN), "wb") as f:
+            f.write(chains)
+
+        big_bed = os.path.join(workdir, prefix + BIG_BED_OUTPUT)
+        big_link = os.path.join(workdir, prefix + BIG_CHAIN_OUTPUT)
+        async with self.semaphore:
+            await self._exec(
+                f"{HG_LOAD_CHAIN} {LOAD_CHAIN_ARGS} {LOAD_CHAIN_GENOME} {LOAD_CHAIN_FORMAT} {SERVICE_CHAIN}",
+                scratch
+            )
+            self.chain._to_big_chain(os.path.join(scratch, "chain.tab"), os.path.join(scratch, "chain.bigChain"))
+            self.chain._to_big_link(os.path.join(scratch, "link.tab"), os.path.join(scratch, BIG_LINK_OUTPUT))
+            await asyncio.gather(
+                self._exec(f"{BED_TO_BIGBED} {BIG_BED_TYPE_SIX} -as={BIG_CHAIN} -tab chain.bigChain {sizes} {big_bed}", scratch),
+                self._exec(f"{BED_TO_BIGBED} {BIG_BED_TYPE_FOUR} -as={BIG_LINK} -tab {BIG_LINK_OUTPUT} {sizes} {big_link}", scratch)
+            )
+
+        shutil.rmtree(scratch)
+        return
+
+
+
+    def _evict(self):
+        """Drop least recently used tracks beyond the cache size, with their files.
+
+        Builds still running or awaited by a client are never evicted, so the
+        cache may briefly hold more entries than --cache_size.
+        """
+        for key in list(self.cache):
+            if len(self.cache) <= max(self.args.cache_size, 1):
+                break
+            task = self.cache[key]
+            if not task.done() or self.waiters.get(key):
+                continue
+            del self.cache[key]
+            if not task.cancelled() and not task.exception():
+                shutil.rmtree(task.result(), ignore_errors=True)
+
+
+
+    async def lookup(self, request):
+        """Answer one request, building its track only on a cache miss."""
+        ids = self.chain_ids(request)
+        if not ids:
+            raise ValueError("No chains found for the request.")
+        missing = [i for i in ids if i not in self.index]
+        if missing:
+            raise ValueError(f"Chain(s) not found: {','.join(missing)}")
+
+        key = hashlib.md5(f"{self.input_id}|{','.join(ids)}".encode()).hexdigest()[:16]
+        cached = key in self.cache
+        if cached:
+            self.cache.move_to_end(key)
+            task = self.cache[key]
+        else:
+            task = asyncio.ensure_future(self.build(key, ids))
+            self.cache[key] = task
+
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            workdir = await asyncio.shield(task)
+        except Exception:
+            if self.cache.get(key) is task:
+                del self.cache[key]
+            raise
+        finally:
+            self._evict()
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+        path = "/".join([self.service_url, os.path.basename(workdir)])
+        name, description = request.get("name"), request.get("description")
+        response = {
+            "status": SUCCESS,
+            "cached": cached,
+            "chains": ids,
+            "bigBed": os.path.join(workdir, BIG_BED_OUTPUT),
+            "linkBed": os.path.join(workdir, BIG_CHAIN_OUTPUT),
+            "track": self.chain.track_line(path, name, description),
+        }
+
+        if self.args.swap:
+            name = f"{name}_{SWAP}" if name else self.args.query_genome
+            description = f"{description} ({self.args.query_genome})" if description else None
+            response["queryBigBed"] = os.path.join(workdir, QUERY_PREFIX + BIG_BED_OUTPUT)
+            response["queryLinkBed"] = os.path.join(workdir, QUERY_PREFIX + BIG_CHAIN_OUTPUT)
+            response["track"] += "\n" + self.chain.track_line(path, name, description, QUERY_PREFIX)
+        return response
+
+
+
+    async def handle(self, reader, writer):
+        """Serve JSON line requests from one client connection."""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # request line over the stream limit, its remainder cannot be resynced
+                    writer.write((json.dumps({"status": FAILURE, "error": str(e)}) + "\n").encode())
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    response = await self.lookup(json.loads(line))
+                except Exception as e:
+                    response = {"status": FAILURE, "error": str(e)}
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+
+    async def serve(self):
+        """Listen on a Unix socket (if given) or on localhost TCP."""
+        self.semaphore = asyncio.Semaphore(max(self.args.threads, 1))
+        shutil.rmtree(self.service_dir, ignore_errors=True)
+        os.makedirs(self.service_dir, exist_ok=True)
+        if self.args.socket:
+            server = await asyncio.start_unix_server(self.handle, path=self.args.socket)
+            print(f"Chainify service listening on {self.args.socket}")
+        else:
+            server = await asyncio.start_server(self.handle, SERVICE_HOST, self.args.port)
+            print(f"Chainify service listening on {SERVICE_HOST}:{self.args.port}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            os.close(self.fd)
+            shutil.rmtree(self.service_dir, ignore_errors=True)
+            if self.args.socket and os.path.exists(self.args.socket):
+                os.remove(self.args.socket)
+
+
+
 def parse_args():
     app = argparse.ArgumentParser()
     app.add_argument(
@@ -516,7 +1257,7 @@ def parse_args():
     app.add_argument(
         "-m",
         "--mode",
-        help="Chanify mode: gene or whole genome",
+        help="Chanify mode: gene, chromosome, genome, hub (per-chromosome shards), stats or serve",
         required=False,
         type=str
     )
@@ -528,6 +1269,97 @@ def parse_args():
         type=str
     )
 
+    app.add_argument(
+        "-cps",
+        "--chroms_per_shard",
+        help="Number of chromosomes grouped in each hub shard",
+        default=1,
+        required=False,
+        type=int
+    )
+    app.add_argument(
+        "-t",
+        "--threads",
+        help="Number of shards (or service tracks) built in parallel",
+        default=os.cpu_count(),
+        required=False,
+        type=int
+    )
+    app.add_argument(
+        "-tg",
+        "--target_genome",
+        help="Target assembly name used in the hub genomes.txt",
+        default=LOAD_CHAIN_GENOME,
+        required=False,
+        type=str
+    )
+    app.add_argument(
+        "-qg",
+        "--query_genome",
+        help="Query assembly name used in the hub (and for the --swap tracks), required with --swap in hub mode",
+        required=False,
+        type=str
+    )
+    app.add_argument(
+        "-hu",
+        "--hub_url",
+        help="Base URL serving the shared folder (defaults to the GBiB shared folder URL)",
+        required=False,
+        type=str
+    )
+    app.add_argument(
+        "-e",
+        "--email",
+        help="Contact email written to the hub.txt, required in hub mode",
+        required=False,
+        type=str
+    )
+
+    app.add_argument(
+        "-sw",
+        "--swap",
+        help="Also project the chains on the query genome (needs -qs)",
+        action="store_true"
+    )
+    app.add_argument(
+        "-qs",
+        "--query_sizes",
+        help="Query chromosome sizes file, required with --swap",
+        required=False,
+        type=str
+    )
+
+    app.add_argument(
+        "-st",
+        "--stats",
+        help="Also write chain statistics (TSV/JSON) computed while reading the chain file",
+        action="store_true"
+    )
+
+    app.add_argument(
+        "-p",
+        "--port",
+        help="Localhost port of the serve mode",
+        default=SERVICE_PORT,
+        required=False,
+        type=int
+    )
+    app.add_argument(
+        "-so",
+        "--socket",
+        help="Unix socket of the serve mode (used instead of --port)",
+        required=False,
+        type=str
+    )
+    app.add_argument(
+        "-cs",
+        "--cache_size",
+        help="Number of recently built tracks kept by the serve mode",
+        default=SERVICE_CACHE,
+        required=False,
+        type=int
+    )
+
     if len(sys.argv) < 2:
         app.print_help()
         sys.exit(0)
@@ -538,6 +1370,21 @@ def parse_args():
         error_msg = ("Chromosome not provided. Please provide a chromosome.")
         sys.exit(error_msg)
 
+    if args.mode == HUB and not args.email:
+        error_msg = ("Hub contact email not provided. Please provide it with -e to use hub mode.")
+        sys.exit(error_msg)
+
+    if args.swap and not args.query_sizes:
+        error_msg = ("Query chromosome sizes not provided. Please provide them with -qs to use --swap.")
+        sys.exit(error_msg)
+
+    if args.swap and args.mode == HUB and not args.query_genome:
+        error_msg = ("Query assembly not provided. Please provide it with -qg to use --swap in hub mode.")
+        sys.exit(error_msg)
+
+    if not args.query_genome:
+        args.query_genome = QUERY_GENOME
+
     return args
 
 
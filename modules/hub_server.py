@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+
+
+import os
+import sys
+import re
+import argparse
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+
+__author__ = "Alejandro Gonzales-Irribarren"
+__email__ = "jose.gonzalesdezavala1@unmsm.edu.pe"
+
+
+
+HOST = "127.0.0.1"
+PORT = 8000
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single byte-range support (as bigBed readers need)."""
+
+    def send_head(self):
+        self.range = None
+        header = self.headers.get("Range")
+        if not header:
+            return super().send_head()
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().send_head()
+
+        match = BYTE_RANGE.match(header.strip())
+        if not match or match.groups() == ("", ""):
+            self.send_error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, "Invalid range")
+            return None
+
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        size = os.fstat(f.fileno()).st_size
+        first, last = match.groups()
+        if not first:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+
+        if start >= size or start > end:
+            f.close()
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        self.range = (start, end)
+        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return f
+
+
+    def end_headers(self):
+        if not self.headers.get("Range"):
+            self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+
+    def copyfile(self, source, outputfile):
+        if not self.range:
+            return super().copyfile(source, outputfile)
+
+        start, end = self.range
+        source.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = source.read(min(64 * 1024, remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            remaining -= len(chunk)
+
+
+
+def serve(directory, host=HOST, port=PORT):
+    """Serve a track hub directory over HTTP with range requests enabled."""
+    handler = partial(RangeRequestHandler, directory=directory)
+    with ThreadingHTTPServer((host, port), handler) as httpd:
+        print(f"Serving {directory} at http://{host}:{port}/")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("Server stopped.")
+
+
+
+def parse_args():
+    app = argparse.ArgumentParser()
+    app.add_argument(
+        "directory",
+        help="Directory to serve (e.g. the shared folder holding chainify_hub)",
+        type=str
+    )
+    app.add_argument(
+        "-p",
+        "--port",
+        help="Port to listen on",
+        default=PORT,
+        type=int
+    )
+    app.add_argument(
+        "-H",
+        "--host",
+        help="Address to bind",
+        default=HOST,
+        type=str
+    )
+    return app.parse_args()
+
+
+
+def main():
+    args = parse_args()
+    if not os.path.isdir(args.directory):
+        sys.exit(f"{args.directory} does not exist.")
+    serve(args.directory, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+
+
+import os
+import json
+import math
+from array import array
+
+
+
+__author__ = "Alejandro Gonzales-Irribarren"
+__email__ = "jose.gonzalesdezavala1@unmsm.edu.pe"
+
+
+
+STATS_TSV = "chain_stats.tsv"
+STATS_JSON = "chain_stats.json"
+MERGE_BLOCKS = 1000000
+NON_POSITIVE = "<=0"
+TOTAL = "total"
+TSV_COLUMNS = [
+    "chrom", "size", "chains", "positive_chains", "aligned_bases",
+    "target_gap_bases", "query_gap_bases", "covered_bases", "coverage"
+]
+
+
+
+def score_bin(score):
+    """Log10 histogram bin of a chain score (e.g. 1e3-1e4)."""
+    if score <= 0:
+        return NON_POSITIVE
+    decade = int(math.floor(math.log10(score)))
+    return f"1e{decade}-1e{decade + 1}"
+
+
+
+def merge_intervals(starts, ends):
+    """Union of [start, end) intervals as sorted, disjoint start and end arrays."""
+    merged_starts, merged_ends = array("q"), array("q")
+    for start, end in sorted(zip(starts, ends)):
+        if merged_ends and start <= merged_ends[-1]:
+            if end > merged_ends[-1]:
+                merged_ends[-1] = end
+        else:
+            merged_starts.append(start)
+            merged_ends.append(end)
+    return (merged_starts, merged_ends)
+
+
+
+def merged_length(starts, ends):
+    """Number of bases covered by the union of [start, end) intervals."""
+    merged_starts, merged_ends = merge_intervals(starts, ends)
+    return sum(merged_ends) - sum(merged_starts)
+
+
+
+class ChainStats:
+    """Per target chromosome chain statistics, filled one chain at a time."""
+    def __init__(self):
+        self.chroms = {}
+
+
+    def _chrom(self, name):
+        if name not in self.chroms:
+            self.chroms[name] = {
+                "chains": 0,
+                "positive_chains": 0,
+                "aligned_bases": 0,
+                "target_gap_bases": 0,
+                "query_gap_bases": 0,
+                "score_histogram": {},
+                "starts": array("q"),
+                "ends": array("q"),
+                "merge_at": MERGE_BLOCKS,
+            }
+        return self.chroms[name]
+
+
+    def add(self, header, blocks):
+        """Account for one chain given its header line and block lines."""
+        fields = header.split()
+        score = float(fields[1])
+        chrom = self._chrom(fields[2])
+        t = int(fields[5])
+
+        chrom["chains"] += 1
+        if score > 0:
+            chrom["positive_chains"] += 1
+        hist = chrom["score_histogram"]
+        key = score_bin(score)
+        hist[key] = hist.get(key, 0) + 1
+
+        for block in blocks:
+            block = block.split()
+            if not block:
+                continue
+            size = int(block[0])
+            chrom["starts"].append(t)
+            chrom["ends"].append(t + size)
+            chrom["aligned_bases"] += size
+            t += size
+            if len(block) == 3:
+                dt, dq = int(block[1]), int(block[2])
+                chrom["target_gap_bases"] += dt
+                chrom["query_gap_bases"] += dq
+                t += dt
+
+        if len(chrom["starts"]) >= chrom["merge_at"]:
+            self._merge(chrom)
+
+
+    def _merge(self, chrom):
+        """Collapse the stored blocks of a chromosome into their union.
+
+        The next merge is scheduled once the arrays double, so chromosomes
+        whose union stays large are not re-sorted after every chain.
+        """
+        chrom["starts"], chrom["ends"] = merge_intervals(chrom["starts"], chrom["ends"])
+        chrom["merge_at"] = max(MERGE_BLOCKS, 2 * len(chrom["starts"]))
+
+
+    def summary(self, chrom_sizes=None):
+        """Return {chromosome: stats} plus a genome-wide total entry."""
+        chrom_sizes = chrom_sizes if chrom_sizes else {}
+        summary = {}
+        total = {k: 0 for k in TSV_COLUMNS[2:-1]}
+        total["score_histogram"] = {}
+        total_size = sum(chrom_sizes.values())
+
+        for name in sorted(self.chroms):
+            chrom = self.chroms[name]
+            size = chrom_sizes.get(name)
+            covered = merged_length(chrom["starts"], chrom["ends"])
+            summary[name] = {
+                "size": size,
+                "chains": chrom["chains"],
+                "positive_chains": chrom["positive_chains"],
+                "aligned_bases": chrom["aligned_bases"],
+                "target_gap_bases": chrom["target_gap_bases"],
+                "query_gap_bases": chrom["query_gap_bases"],
+                "covered_bases": covered,
+                "coverage": round(covered / size, 6) if size else None,
+                "score_histogram": dict(sorted(chrom["score_histogram"].items())),
+            }
+
+            for k in total:
+                if k == "score_histogram":
+                    for b, n in chrom["score_histogram"].items():
+                        total[k][b] = total[k].get(b, 0) + n
+                else:
+                    total[k] += summary[name][k]
+
+        total["size"] = total_size if total_size else None
+        total["coverage"] = round(total["covered_bases"] / total_size, 6) if total_size else None
+        total["score_histogram"] = dict(sorted(total["score_histogram"].items()))
+        summary[TOTAL] = total
+        return summary
+
+
+    def write(self, directory, chrom_sizes=None):
+        """Write the summary as TSV (one row per chromosome) and JSON files."""
+        os.makedirs(directory, exist_ok=True)
+        summary = self.summary(chrom_sizes)
+
+        tsv = os.path.join(directory, STATS_TSV)
+        with open(tsv, "w") as f:
+            f.write("\t".join(TSV_COLUMNS) + "\n")
+            for name, row in summary.items():
+                values = [name] + [row[k] for k in TSV_COLUMNS[1:]]
+                f.write("\t".join("NA" if v is None else str(v) for v in values) + "\n")
+
+        js = os.path.join(directory, STATS_JSON)
+        with open(js, "w") as f:
+            json.dump(summary, f, indent=2)
+
+        return (tsv, js)